@@ -5,13 +5,39 @@ Aplicação Flask para o Frontend do Sistema de Detecção de Veículos de Emerg
 from flask import (
     Flask, render_template, render_template_string,
     request, redirect, url_for, session, jsonify,
-    send_file, Response, stream_with_context
+    send_file, Response, stream_with_context, g,
+    before_render_template, template_rendered
 )
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from werkzeug.middleware.proxy_fix import ProxyFix
 import requests
 import os
 from dotenv import load_dotenv
 import io
 import time
+import gzip
+import hashlib
+import stat
+import threading
+import math
+import uuid
+import queue
+import bisect
+from urllib.parse import urlsplit, urlunsplit
+from array import array
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional; sem ele usamos apenas gzip
+    brotli = None
+
+try:
+    import cv2
+except ImportError:  # OpenCV é opcional; sem ele o monitoramento de câmeras fica desativado
+    cv2 = None
 
 load_dotenv()
 from datetime import datetime, timedelta
@@ -27,6 +53,271 @@ app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-producti
 API_BASE_URL = os.environ.get('API_BASE_URL', 'http://localhost:8000/api/v1')
 API_TIMEOUT = 30  # segundos
 
+# Vários nós de inferência podem ser informados separados por vírgula;
+# sem API_BASE_URLS usamos apenas o API_BASE_URL
+API_BASE_URLS = [
+    url.strip().rstrip('/')
+    for url in os.environ.get('API_BASE_URLS', API_BASE_URL).split(',')
+    if url.strip()
+]
+API_HEALTH_PATH = os.environ.get('API_HEALTH_PATH', '/health')
+API_HEALTH_INTERVAL = int(os.environ.get('API_HEALTH_INTERVAL', 10))  # segundos
+API_HEALTH_TIMEOUT = 3  # segundos
+API_MAX_FAILURES = int(os.environ.get('API_MAX_FAILURES', 3))  # falhas seguidas até ejetar o nó
+API_AFFINITY_SIZE = 10000  # job_ids/detection_ids lembrados por worker
+
+# =====================================================================
+# CONFIGURAÇÃO DE COMPRESSÃO E CACHE HTTP
+# =====================================================================
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))  # bytes
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL', 6))
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv',
+    'text/javascript', 'application/javascript',
+    'application/json', 'image/svg+xml',
+}
+
+# =====================================================================
+# CONFIGURAÇÃO DE CACHE DE TEMPLATES
+# =====================================================================
+# Diretório compartilhado entre os workers do gunicorn para o bytecode compilado do Jinja.
+# Fica na pasta instance da aplicação e precisa ser exclusivo do usuário do processo
+JINJA_BYTECODE_CACHE_DIR = os.environ.get(
+    'JINJA_BYTECODE_CACHE_DIR',
+    os.path.join(app.instance_path, 'jinja_cache')
+)
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 5000))  # fragmentos por worker
+FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 600))  # segundos
+
+# =====================================================================
+# CONFIGURAÇÃO DE CONTROLE DE ADMISSÃO
+# =====================================================================
+# Limites por worker: requisições simultâneas, tamanho da fila e requisições por usuário
+ADMISSION_LIMITS = {
+    'upload': {
+        'max_active': int(os.environ.get('ADMISSION_UPLOAD_CONCURRENCY', 2)),
+        'max_queue': int(os.environ.get('ADMISSION_UPLOAD_QUEUE', 4)),
+        'per_user': int(os.environ.get('ADMISSION_UPLOAD_PER_USER', 1)),
+    },
+    'media': {
+        'max_active': int(os.environ.get('ADMISSION_MEDIA_CONCURRENCY', 4)),
+        'max_queue': int(os.environ.get('ADMISSION_MEDIA_QUEUE', 8)),
+        'per_user': int(os.environ.get('ADMISSION_MEDIA_PER_USER', 3)),
+    },
+    'interactive': {
+        'max_active': int(os.environ.get('ADMISSION_INTERACTIVE_CONCURRENCY', 16)),
+        'max_queue': int(os.environ.get('ADMISSION_INTERACTIVE_QUEUE', 32)),
+        'per_user': int(os.environ.get('ADMISSION_INTERACTIVE_PER_USER', 8)),
+    },
+}
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 10))  # segundos
+# Quantidade de proxies reversos confiáveis à frente da aplicação; com 0 o
+# X-Forwarded-For é ignorado e request.remote_addr é o endereço da conexão
+PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+# =====================================================================
+# CONFIGURAÇÃO DA SINCRONIZAÇÃO INCREMENTAL
+# =====================================================================
+SYNC_MIN_INTERVAL = float(os.environ.get('SYNC_MIN_INTERVAL', 2))  # segundos entre consultas ao backend
+SYNC_SNAPSHOTS = 64  # conjuntos (IDs e fingerprints) lembrados para deltas exatos
+SYNC_MAX_STORES = 256  # coleções (por usuário) mantidas em memória por worker
+SYNC_MAX_VOLATILE_IDS = 50  # IDs em andamento levados no token; acima disso o fallback reenvia tudo
+
+# =====================================================================
+# CONFIGURAÇÃO DO MONITORAMENTO DE CÂMERAS
+# =====================================================================
+STREAM_SAMPLE_INTERVAL = float(os.environ.get('STREAM_SAMPLE_INTERVAL', 1.0))  # segundos entre amostras
+STREAM_MOTION_THRESHOLD = float(os.environ.get('STREAM_MOTION_THRESHOLD', 0.02))  # fração de pixels alterados
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', 8))  # quadros aguardando envio por câmera
+STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 4))  # quadros enviados juntos ao backend
+STREAM_WORKERS = int(os.environ.get('STREAM_WORKERS', 4))  # threads que chamam /detections/image
+STREAM_RECENT_DETECTIONS = 50  # detecções exibidas na página ao vivo
+STREAM_JPEG_QUALITY = 85
+STREAM_MAX_INACTIVE = int(os.environ.get('STREAM_MAX_INACTIVE', 10))  # câmeras encerradas mantidas para consulta
+
+# =====================================================================
+# CONFIGURAÇÃO DO ÍNDICE DE RESULTADOS DE VÍDEO
+# =====================================================================
+RESULTS_INDEX_CACHE_SIZE = int(os.environ.get('RESULTS_INDEX_CACHE_SIZE', 16))  # jobs concluídos por worker
+RESULTS_PAGE_SIZE = 100
+RESULTS_MAX_PAGE_SIZE = 1000
+RESULTS_MIN_BUCKET = 0.1  # segundos; menor intervalo aceito na linha do tempo
+RESULTS_MAX_BUCKETS = 10000  # intervalos por linha do tempo
+RESULTS_TIMELINES_PER_JOB = 4  # linhas do tempo (tamanhos de intervalo) memorizadas por job
+
+
+# =====================================================================
+# POOL DE NÓS DO BACKEND
+# =====================================================================
+
+class BackendNode:
+    """Estado de um nó de inferência do backend"""
+
+    def __init__(self, url):
+        self.url = url
+        self.healthy = True
+        self.outstanding = 0
+        self.failures = 0
+
+    def snapshot(self):
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'outstanding': self.outstanding,
+            'failures': self.failures,
+        }
+
+
+class BackendPool:
+    """
+    Distribui as chamadas entre os nós do backend.
+
+    - Chamadas sem chave vão para o nó saudável com menos requisições em andamento.
+    - Chamadas com chave (job_id, detection_id) são fixadas no nó que criou o recurso;
+      se este worker não conhece o nó, os demais são tentados até um deles não responder 404.
+    - Nós com API_MAX_FAILURES falhas seguidas são ejetados e voltam após um health check bem-sucedido.
+    """
+
+    def __init__(self, urls, health_path, health_interval, max_failures):
+        self.nodes = [BackendNode(url) for url in urls]
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.max_failures = max_failures
+        self._affinity = OrderedDict()
+        self._lock = threading.Lock()
+        self._checker_pid = None
+        self._next_node = -1
+
+    def _ensure_health_checker(self):
+        # Cada worker do gunicorn (processo filho) precisa da sua própria thread
+        if len(self.nodes) < 2 or self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+        threading.Thread(target=self._health_loop, name='backend-health', daemon=True).start()
+
+    def _health_loop(self):
+        while True:
+            for node in self.nodes:
+                try:
+                    response = requests.get(f"{node.url}{self.health_path}", timeout=API_HEALTH_TIMEOUT)
+                    alive = response.status_code < 500
+                except requests.exceptions.RequestException:
+                    alive = False
+                if alive:
+                    self.mark_success(node)
+                else:
+                    self.mark_failure(node)
+            time.sleep(self.health_interval)
+
+    def mark_success(self, node):
+        with self._lock:
+            if not node.healthy:
+                print(f"✅ Nó do backend readmitido: {node.url}")
+            node.failures = 0
+            node.healthy = True
+
+    def mark_failure(self, node):
+        with self._lock:
+            node.failures += 1
+            if node.healthy and node.failures >= self.max_failures:
+                node.healthy = False
+                print(f"❌ Nó do backend ejetado após {node.failures} falhas: {node.url}")
+
+    def remember(self, key, node):
+        """Fixa o recurso identificado por key no nó que o processou"""
+        with self._lock:
+            self._affinity[str(key)] = node
+            self._affinity.move_to_end(str(key))
+            while len(self._affinity) > API_AFFINITY_SIZE:
+                self._affinity.popitem(last=False)
+
+    def candidates(self, key=None):
+        """Nós em ordem de preferência: nó fixado pela chave e depois os menos carregados"""
+        self._ensure_health_checker()
+        with self._lock:
+            healthy = [node for node in self.nodes if node.healthy] or list(self.nodes)
+            # Rodízio antes da ordenação (estável): empates de carga são distribuídos entre os nós
+            self._next_node = (self._next_node + 1) % len(healthy)
+            healthy = healthy[self._next_node:] + healthy[:self._next_node]
+            ordered = sorted(healthy, key=lambda node: node.outstanding)
+            pinned = self._affinity.get(str(key)) if key is not None else None
+        if pinned is not None:
+            ordered = [pinned] + [node for node in ordered if node is not pinned]
+        return ordered
+
+    def request(self, method, endpoint, key=None, **kwargs):
+        """
+        Executa a requisição no melhor nó e devolve a resposta do requests.
+        O nó que atendeu fica disponível em response.backend_node.
+        Com stream=True o nó continua contando como ocupado até response.close().
+        """
+        streaming = kwargs.get('stream', False)
+        nodes = self.candidates(key)
+        for position, node in enumerate(nodes):
+            is_last = position == len(nodes) - 1
+            with self._lock:
+                node.outstanding += 1
+            release = self._releaser(node)
+            try:
+                response = requests.request(method, f"{node.url}{endpoint}", **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                release()
+                self.mark_failure(node)
+                # Uploads não são repetidos: o stream do arquivo já foi consumido
+                if is_last or method != 'GET':
+                    raise
+                continue
+            except Exception:
+                release()
+                raise
+
+            if streaming:
+                close = response.close
+
+                def close_and_release(close=close, release=release):
+                    try:
+                        close()
+                    finally:
+                        release()
+
+                response.close = close_and_release
+            else:
+                release()
+
+            if response.status_code in (502, 503, 504):
+                self.mark_failure(node)
+            else:
+                self.mark_success(node)
+            if key is not None and method == 'GET' and response.status_code == 404 and not is_last:
+                response.close()
+                continue
+            if key is not None and response.status_code < 400:
+                self.remember(key, node)
+            response.backend_node = node
+            return response
+
+    def _releaser(self, node):
+        """Função que decrementa a carga do nó uma única vez"""
+        released = []
+
+        def release():
+            with self._lock:
+                if not released:
+                    released.append(True)
+                    node.outstanding -= 1
+
+        return release
+
+    def snapshot(self):
+        with self._lock:
+            return [node.snapshot() for node in self.nodes]
+
+
+backend_pool = BackendPool(API_BASE_URLS, API_HEALTH_PATH, API_HEALTH_INTERVAL, API_MAX_FAILURES)
+
 
 # =====================================================================
 # FUNÇÕES DE AUTENTICAÇÃO E UTILITÁRIOS
@@ -56,25 +347,24 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def api_call(method, endpoint, data=None, files=None, params=None):
-    url = f"{API_BASE_URL}{endpoint}"
+def api_call(method, endpoint, data=None, files=None, params=None, key=None):
     headers = get_auth_header()
     try:
         if method == 'GET':
-            response = requests.get(url, headers=headers, params=params, timeout=API_TIMEOUT)
+            response = backend_pool.request('GET', endpoint, key=key, headers=headers, params=params, timeout=API_TIMEOUT)
         elif method == 'POST':
             if files:
                 # Para upload de arquivos, não definir Content-Type - requests fará automaticamente
                 headers.pop('Content-Type', None)
-                response = requests.post(url, headers=headers, files=files, data=data, timeout=API_TIMEOUT)
+                response = backend_pool.request('POST', endpoint, key=key, headers=headers, files=files, data=data, timeout=API_TIMEOUT)
             else:
                 headers['Content-Type'] = 'application/json'
-                response = requests.post(url, headers=headers, json=data, timeout=API_TIMEOUT)
+                response = backend_pool.request('POST', endpoint, key=key, headers=headers, json=data, timeout=API_TIMEOUT)
         elif method == 'PUT':
             headers['Content-Type'] = 'application/json'
-            response = requests.put(url, headers=headers, json=data, timeout=API_TIMEOUT)
+            response = backend_pool.request('PUT', endpoint, key=key, headers=headers, json=data, timeout=API_TIMEOUT)
         elif method == 'DELETE':
-            response = requests.delete(url, headers=headers, timeout=API_TIMEOUT)
+            response = backend_pool.request('DELETE', endpoint, key=key, headers=headers, timeout=API_TIMEOUT)
         else:
             return False, {'error': 'Método HTTP inválido'}, 400
 
@@ -89,6 +379,362 @@ def api_call(method, endpoint, data=None, files=None, params=None):
         return False, {'error': str(e)}, 500
 
 
+# =====================================================================
+# COMPRESSÃO E GET CONDICIONAL (ETag / 304)
+# =====================================================================
+
+def no_compression(f):
+    """Desativa a compressão da resposta para a rota decorada"""
+    f._no_compression = True
+    return f
+
+def no_etag(f):
+    """Desativa o cálculo de ETag e o 304 para a rota decorada"""
+    f._no_etag = True
+    return f
+
+def payload_etag(payload):
+    """Calcula um ETag forte a partir do payload (JSON) recebido da API"""
+    raw = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha1(raw).hexdigest()
+
+def _choose_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(COMPRESSION_LEVEL, 11))
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+
+@app.after_request
+def optimize_response(response):
+    """Adiciona ETag, responde 304 quando possível e comprime respostas textuais grandes"""
+    if response.status_code != 200:
+        return response
+    # Respostas em streaming (proxy de vídeo, send_file) são repassadas sem alterações
+    if response.is_streamed or response.direct_passthrough:
+        return response
+    if response.headers.get('Content-Encoding'):
+        return response
+
+    view = app.view_functions.get(request.endpoint)
+    compress_allowed = not getattr(view, '_no_compression', False)
+    # GET condicional só faz sentido para GET/HEAD; os relatórios (POST) são apenas comprimidos
+    etag_allowed = request.method in ('GET', 'HEAD') and not getattr(view, '_no_etag', False)
+
+    body = response.get_data()
+    encoding = None
+    if compress_allowed and response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add('Accept-Encoding')
+        if len(body) >= COMPRESSION_MIN_SIZE:
+            encoding = _choose_encoding()
+
+    if etag_allowed:
+        etag, weak = response.get_etag()
+        if etag is None:
+            # HTML é semanticamente equivalente entre renderizações, então usamos ETag fraco
+            etag, weak = hashlib.sha1(body).hexdigest(), response.mimetype == 'text/html'
+        if encoding:
+            # Cada representação comprimida precisa de um ETag próprio
+            etag = f'{etag}-{encoding}'
+        response.set_etag(etag, weak=weak)
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = 'private, no-cache'
+
+        if request.if_none_match.contains_weak(etag):
+            not_modified = app.response_class(status=304)
+            for header in ('ETag', 'Cache-Control', 'Vary'):
+                if header in response.headers:
+                    not_modified.headers[header] = response.headers[header]
+            return not_modified
+
+    if encoding:
+        response.set_data(_compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+
+    return response
+
+
+# =====================================================================
+# CACHE DE TEMPLATES (BYTECODE E FRAGMENTOS)
+# =====================================================================
+
+class FragmentCache:
+    """Cache LRU em memória, com expiração, para trechos de HTML já renderizados"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+fragment_cache = FragmentCache(FRAGMENT_CACHE_SIZE, FRAGMENT_CACHE_TTL)
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Tag {% cache 'prefixo', id, item|payload_etag %}...{% endcache %}
+
+    O conteúdo do bloco é renderizado uma vez e reaproveitado enquanto as
+    partes da chave não mudarem. Como cada worker tem o próprio cache, a chave
+    deve incluir um digest dos dados exibidos: assim uma edição muda a chave em
+    todos os workers, sem precisar de invalidação.
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key_parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key_parts.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_cache_support', [nodes.List(key_parts)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, key_parts, caller):
+        key = ':'.join(str(part) for part in key_parts)
+        stats = g.setdefault('fragment_cache_stats', {'hits': 0, 'misses': 0})
+        fragment = fragment_cache.get(key)
+        if fragment is None:
+            stats['misses'] += 1
+            fragment = caller()
+            fragment_cache.set(key, fragment)
+        else:
+            stats['hits'] += 1
+        return fragment
+
+
+def _private_cache_dir(path):
+    """
+    Cria o diretório com permissão 0700 e recusa diretórios de outro usuário:
+    o bytecode lido dali é executado como código pelo Jinja
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise RuntimeError(f'Diretório de cache de templates inseguro: {path}')
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        os.chmod(path, 0o700)
+    return path
+
+
+app.jinja_options = {
+    **app.jinja_options,
+    'bytecode_cache': FileSystemBytecodeCache(_private_cache_dir(JINJA_BYTECODE_CACHE_DIR)),
+    'extensions': [FragmentCacheExtension],
+}
+app.add_template_filter(payload_etag)
+
+
+@before_render_template.connect_via(app)
+def _start_render_timer(sender, template, context, **extra):
+    g.setdefault('render_started', []).append(time.perf_counter())
+
+@template_rendered.connect_via(app)
+def _stop_render_timer(sender, template, context, **extra):
+    started = g.get('render_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if not started:  # só contabiliza a renderização mais externa
+        g.render_time = g.get('render_time', 0.0) + elapsed
+
+@app.after_request
+def add_render_timing(response):
+    """Expõe o tempo de renderização e o uso do cache de fragmentos no header Server-Timing"""
+    render_time = g.get('render_time')
+    if render_time is None:
+        return response
+    stats = g.get('fragment_cache_stats', {'hits': 0, 'misses': 0})
+    response.headers['Server-Timing'] = (
+        f'render;dur={render_time * 1000:.2f}, '
+        f'fragcache;desc="hits={stats["hits"]} misses={stats["misses"]}"'
+    )
+    app.logger.debug('Renderização de %s em %.2f ms (fragmentos: %d hits, %d misses)',
+                     request.path, render_time * 1000, stats['hits'], stats['misses'])
+    return response
+
+
+# =====================================================================
+# CONTROLE DE ADMISSÃO
+# =====================================================================
+
+class AdmissionPool:
+    """
+    Limita as requisições simultâneas de uma classe de rotas.
+
+    Quem não encontra vaga espera numa fila limitada; com a fila cheia ou após
+    ADMISSION_QUEUE_TIMEOUT a requisição é recusada com 503. Cada usuário pode
+    ocupar (ativo ou na fila) no máximo per_user vagas, senão recebe 429;
+    requisições com user None não entram no limite por usuário.
+    """
+
+    def __init__(self, name, max_active, max_queue, per_user, queue_timeout):
+        self.name = name
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.per_user = per_user
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = {'queue_full': 0, 'timeout': 0, 'per_user': 0}
+        self.avg_service_time = 1.0  # média móvel, em segundos
+        self._per_user = defaultdict(int)
+        self._cond = threading.Condition()
+
+    def retry_after(self):
+        """Estimativa, em segundos, de quando uma vaga deve ser liberada"""
+        backlog = (self.waiting + 1) / max(self.max_active, 1)
+        return max(1, math.ceil(backlog * self.avg_service_time))
+
+    def acquire(self, user):
+        """Retorna None quando admitida, ou o status HTTP da recusa (429/503)"""
+        with self._cond:
+            if user is not None and self._per_user.get(user, 0) >= self.per_user:
+                self.rejected['per_user'] += 1
+                return 429
+            if self.active >= self.max_active or self.waiting:
+                if self.waiting >= self.max_queue:
+                    self.rejected['queue_full'] += 1
+                    return 503
+                self.waiting += 1
+                self._enter(user)
+                deadline = time.monotonic() + self.queue_timeout
+                try:
+                    while self.active >= self.max_active:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._leave(user)
+                            self.rejected['timeout'] += 1
+                            return 503
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            else:
+                self._enter(user)
+            self.active += 1
+            self.admitted += 1
+            return None
+
+    def _enter(self, user):
+        if user is not None:
+            self._per_user[user] += 1
+
+    def _leave(self, user):
+        if user is None:
+            return
+        self._per_user[user] -= 1
+        if not self._per_user[user]:
+            del self._per_user[user]
+
+    def release(self, user, service_time):
+        with self._cond:
+            self.active -= 1
+            self._leave(user)
+            self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * service_time
+            self._cond.notify()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                'active': self.active,
+                'max_active': self.max_active,
+                'queue_depth': self.waiting,
+                'max_queue': self.max_queue,
+                'per_user_limit': self.per_user,
+                'users': len(self._per_user),
+                'admitted': self.admitted,
+                'rejected': dict(self.rejected),
+                'avg_service_time': round(self.avg_service_time, 3),
+            }
+
+
+admission_pools = {
+    name: AdmissionPool(name, queue_timeout=ADMISSION_QUEUE_TIMEOUT, **limits)
+    for name, limits in ADMISSION_LIMITS.items()
+}
+
+# Rotas que seguram o worker por muito tempo (uploads e espera de processamento)
+UPLOAD_ENDPOINTS = {'detect_image', 'detect_video', 'api_wait_video_completion'}
+# Rotas que repassam mídia do backend
+MEDIA_ENDPOINTS = {'get_annotated_image', 'get_annotated_video', 'get_detection_image'}
+# Rotas fora do limite por usuário: sem sessão, todos os visitantes atrás do
+# mesmo proxy/NAT compartilhariam uma única chave
+PER_USER_EXEMPT_ENDPOINTS = {'login'}
+
+if PROXY_FIX_X_FOR:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_FIX_X_FOR)
+
+def admission_class():
+    """Classifica a requisição atual em upload, media ou interactive"""
+    if request.endpoint in UPLOAD_ENDPOINTS and (request.method == 'POST' or request.endpoint.startswith('api_')):
+        return 'upload'
+    if request.endpoint in MEDIA_ENDPOINTS:
+        return 'media'
+    return 'interactive'
+
+@app.before_request
+def admission_control():
+    if request.endpoint in (None, 'static'):
+        return None
+    pool = admission_pools[admission_class()]
+    if request.endpoint in PER_USER_EXEMPT_ENDPOINTS:
+        user = None
+    else:
+        user = session.get('user_email') or request.remote_addr
+    status = pool.acquire(user)
+    if status is None:
+        g.admission = (pool, user, time.monotonic())
+        return None
+
+    retry_after = pool.retry_after()
+    if status == 429:
+        message = 'Muitas requisições simultâneas. Aguarde a conclusão das anteriores.'
+    else:
+        message = 'Servidor ocupado no momento. Tente novamente em instantes.'
+    # O upload de vídeo é enviado via fetch e espera JSON, assim como as rotas /api/
+    if request.path.startswith('/api/') or request.endpoint == 'detect_video':
+        response = jsonify({'error': message, 'retry_after': retry_after})
+    else:
+        response = app.make_response(render_template('error.html', error=message))
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.teardown_request
+def release_admission(exc):
+    admission = g.pop('admission', None)
+    if admission is not None:
+        pool, user, started = admission
+        pool.release(user, time.monotonic() - started)
+
+
 # =====================================================================
 # ROTAS DE AUTENTICAÇÃO
 # =====================================================================
@@ -226,7 +872,6 @@ def detect_image():
     
     source_id = request.form.get('source_id', 'uploaded_image')
     
-    url = f"{API_BASE_URL}/detections/image"
     headers = get_auth_header()
     
     try:
@@ -234,8 +879,9 @@ def detect_image():
         files = {'file': (file.filename, file.stream, file.content_type)}
         data = {'source_id': source_id}
         
-        response = requests.post(
-            url, 
+        response = backend_pool.request(
+            'POST',
+            '/detections/image',
             headers=headers, 
             files=files, 
             data=data,
@@ -244,6 +890,10 @@ def detect_image():
         
         if response.status_code == 200:
             detections = response.json()
+            # A imagem anotada fica no nó que processou o upload
+            for detection in detections if isinstance(detections, list) else []:
+                if detection.get('_id'):
+                    backend_pool.remember(detection['_id'], response.backend_node)
             print("=== ESTRUTURA DOS DADOS RECEBIDOS ===")
             for i, detection in enumerate(detections):
                 print(f"Detecção {i}:")
@@ -269,19 +919,18 @@ def detect_image():
 @login_required
 def get_annotated_image(detection_id):
     """Serve a imagem anotada com as detecções"""
-    url = f"{API_BASE_URL}/detections/image/annotated/{detection_id}"
     headers = get_auth_header()
     
     try:
-        response = requests.get(url, headers=headers, timeout=API_TIMEOUT, stream=True)
-        
-        if response.status_code == 200:
-            return response.content, 200, {
-                'Content-Type': response.headers.get('Content-Type', 'image/jpeg'),
-                'Content-Disposition': response.headers.get('Content-Disposition', 'inline')
-            }
-        else:
-            return "Imagem não encontrada", 404
+        with backend_pool.request('GET', f'/detections/image/annotated/{detection_id}',
+                                  key=detection_id, headers=headers, timeout=API_TIMEOUT, stream=True) as response:
+            if response.status_code == 200:
+                return response.content, 200, {
+                    'Content-Type': response.headers.get('Content-Type', 'image/jpeg'),
+                    'Content-Disposition': response.headers.get('Content-Disposition', 'inline')
+                }
+            else:
+                return "Imagem não encontrada", 404
             
     except requests.exceptions.RequestException:
         return "Erro ao buscar imagem", 500
@@ -310,8 +959,7 @@ def detect_video():
     
     source_id = request.form.get('source_id', 'uploaded_video')
     
-    # Fazer upload diretamente para a API
-    url = f"{API_BASE_URL}/detections/video"
+    # Fazer upload diretamente para a API, no nó menos carregado
     headers = get_auth_header()
     
     try:
@@ -319,8 +967,9 @@ def detect_video():
         files = {'file': (file.filename, file.stream, file.content_type)}
         data = {'source_id': source_id}
         
-        response = requests.post(
-            url, 
+        response = backend_pool.request(
+            'POST',
+            '/detections/video',
             headers=headers, 
             files=files, 
             data=data,
@@ -329,6 +978,7 @@ def detect_video():
         
         if response.status_code == 200:
             job_data = response.json()
+            backend_pool.remember(job_data['job_id'], response.backend_node)
             return jsonify({'job_id': job_data['job_id']}), 200
         else:
             error_data = response.json() if response.headers.get('content-type') == 'application/json' else {}
@@ -345,9 +995,9 @@ def detect_video():
 def video_status(job_id):
     """Página de status do processamento de vídeo"""
     try:
-        success, job_data, status_code = api_call('GET', f'/detections/video/{job_id}')
+        job_data, index, status_code = load_job_results(job_id)
         
-        if not success:
+        if index is None:
             if status_code == 404:
                 return render_template('error.html', error=f'Job {job_id} não encontrado'), 404
             else:
@@ -357,9 +1007,11 @@ def video_status(job_id):
         if job_data.get('status') != 'completed':
             return render_template('detections/video_status.html', 
                                    job=job_data, 
+                                   results_count=len(index),
                                    not_ready_message="O vídeo ainda está sendo processado. Por favor, verifique a lista de jobs para acompanhar o status.")
 
-        return render_template('detections/video_status.html', job=job_data)                        
+        return render_template('detections/video_status.html', job=job_data, results_count=len(index),
+                               vehicle_types=index.vehicle_types, duration=index.duration)
     except Exception as e:
         print(f"❌ Erro em video_status: {str(e)}")
         return render_template('error.html', error=f'Erro interno: {str(e)}'), 500
@@ -369,18 +1021,23 @@ def video_status(job_id):
 def get_annotated_video(job_id):
     """Serve o vídeo anotado com as detecções - PROXY STREAMING"""
     try:
-        url = f"{API_BASE_URL}/detections/video/annotated/{job_id}"
         headers = get_auth_header()
 
-        backend_resp = requests.get(url, headers=headers, timeout=API_TIMEOUT, stream=True)
+        backend_resp = backend_pool.request('GET', f'/detections/video/annotated/{job_id}',
+                                            key=job_id, headers=headers, timeout=API_TIMEOUT, stream=True)
 
         if backend_resp.status_code != 200:
+            backend_resp.close()
             return "Vídeo anotado não encontrado ou não processado", backend_resp.status_code
 
         def generate():
-            for chunk in backend_resp.iter_content(chunk_size=8192):
-                if chunk:
-                    yield chunk
+            # Fechar a resposta libera a vaga do nó no pool apenas ao fim da transferência
+            try:
+                for chunk in backend_resp.iter_content(chunk_size=8192):
+                    if chunk:
+                        yield chunk
+            finally:
+                backend_resp.close()
 
         response = Response(
             stream_with_context(generate()),
@@ -408,7 +1065,7 @@ def get_annotated_video(job_id):
 @login_required
 def get_detection_image(detection_id):
     """Serve a imagem de uma detecção específica"""
-    success, detection, _ = api_call('GET', f'/detections/{detection_id}')
+    success, detection, _ = api_call('GET', f'/detections/{detection_id}', key=detection_id)
     
     if not success or not detection.get('media_reference'):
         return "Imagem não encontrada", 404
@@ -418,31 +1075,44 @@ def get_detection_image(detection_id):
     if os.path.exists(image_path):
         return send_file(image_path, mimetype='image/jpeg')
     else:
-        url = f"{API_BASE_URL}/detections/image/annotated/{detection_id}"
         headers = get_auth_header()
         
         try:
-            response = requests.get(url, headers=headers, timeout=API_TIMEOUT, stream=True)
-            if response.status_code == 200:
-                image_data = io.BytesIO(response.content)
-                return send_file(
-                    image_data,
-                    mimetype=response.headers.get('Content-Type', 'image/jpeg')
-                )
-            else:
-                return "Imagem não encontrada", 404
+            with backend_pool.request('GET', f'/detections/image/annotated/{detection_id}',
+                                      key=detection_id, headers=headers, timeout=API_TIMEOUT, stream=True) as response:
+                if response.status_code == 200:
+                    image_data = io.BytesIO(response.content)
+                    return send_file(
+                        image_data,
+                        mimetype=response.headers.get('Content-Type', 'image/jpeg')
+                    )
+                else:
+                    return "Imagem não encontrada", 404
         except requests.exceptions.RequestException:
             return "Erro ao buscar imagem", 500
 
+@app.route('/api/admission/metrics')
+@admin_required
+@no_etag
+def api_admission_metrics():
+    """Métricas de fila e concorrência do controle de admissão deste worker"""
+    return jsonify({
+        'pid': os.getpid(),
+        'pools': {name: pool.snapshot() for name, pool in admission_pools.items()},
+        'backend_nodes': backend_pool.snapshot(),
+    })
+
 @app.route('/api/detections/video/<job_id>/status')
 @login_required
 def api_video_status(job_id):
     """API endpoint para verificar status do job"""
     try:
-        success, job_data, status_code = api_call('GET', f'/detections/video/{job_id}')
+        success, job_data, status_code = api_call('GET', f'/detections/video/{job_id}', key=job_id)
         
         if success:
-            return jsonify(job_data)
+            response = jsonify(job_data)
+            response.set_etag(payload_etag(job_data))
+            return response
         else:
             return jsonify({'error': 'Job não encontrado'}), 404
             
@@ -452,6 +1122,7 @@ def api_video_status(job_id):
 
 @app.route('/api/detections/video/<job_id>/wait-completion')
 @login_required
+@no_etag
 def api_wait_video_completion(job_id):
     """API endpoint para aguardar conclusão do processamento"""
     max_wait_time = 300  # 5 minutos máximo
@@ -459,7 +1130,7 @@ def api_wait_video_completion(job_id):
     start_time = time.time()
     
     while time.time() - start_time < max_wait_time:
-        success, job_data, status_code = api_call('GET', f'/detections/video/{job_id}')
+        success, job_data, status_code = api_call('GET', f'/detections/video/{job_id}', key=job_id)
         
         if not success:
             return jsonify({'error': 'Job não encontrado'}), 404
@@ -493,8 +1164,10 @@ def list_image_detections():
     detections = data if success and isinstance(data, list) else []
     
     message = request.args.get('message')
+    sync_version = get_sync_store('detections').update(detections)
     
-    return render_template('detections/images_list.html', detections=detections, message=message)
+    return render_template('detections/images_list.html', detections=detections, message=message,
+                           sync_version=sync_version)
 
 
 @app.route('/detections/video/jobs')
@@ -508,7 +1181,733 @@ def video_jobs_list():
         jobs = jobs_data
     
     message = request.args.get('message')
-    return render_template('detections/video_jobs_list.html', jobs=jobs, message=message)
+    sync_version = get_sync_store('jobs').update(jobs)
+    return render_template('detections/video_jobs_list.html', jobs=jobs, message=message,
+                           sync_version=sync_version)
+
+
+# =====================================================================
+# ÍNDICE DE RESULTADOS POR QUADRO DOS VÍDEOS
+# =====================================================================
+
+def _result_number(value):
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+class JobResultsIndex:
+    """
+    Resultados de um job de vídeo concluído em formato colunar.
+
+    As detecções ficam ordenadas pelo tempo no vídeo (segundos), em arrays
+    compactos, com um índice de posições por tipo de veículo. Consultas por
+    janela de tempo usam busca binária, sem percorrer todos os resultados.
+    """
+
+    def __init__(self, job_id, results, fps=None):
+        self.job_id = job_id
+        rows = []
+        for position, result in enumerate(results):
+            if not isinstance(result, dict):
+                continue
+            moment = None
+            for field in ('timestamp', 'time', 'video_time', 'seconds'):
+                moment = _result_number(result.get(field))
+                if moment is not None:
+                    break
+            frame = result.get('frame_number', result.get('frame'))
+            frame = int(frame) if isinstance(frame, (int, float)) else -1
+            if moment is None:
+                moment = frame / fps if frame >= 0 and fps else float(position)
+            confidence = _result_number(result.get('confidence_score', result.get('confidence')))
+            rows.append((moment, frame, str(result.get('vehicle_type', 'unknown')),
+                         confidence if confidence is not None and math.isfinite(confidence) else 0.0,
+                         bool(result.get('siren_on'))))
+        rows.sort(key=lambda row: row[0])
+
+        # Timestamps absolutos (ISO) viram segundos desde a primeira detecção
+        offset = rows[0][0] if rows and rows[0][0] > 10 ** 8 else 0.0
+        self.vehicle_types = sorted({row[2] for row in rows})
+        type_codes = {vehicle_type: code for code, vehicle_type in enumerate(self.vehicle_types)}
+
+        self.times = array('d', (row[0] - offset for row in rows))
+        self.frames = array('l', (row[1] for row in rows))
+        self.type_codes = array('H', (type_codes[row[2]] for row in rows))
+        self.confidences = array('f', (row[3] for row in rows))
+        self.sirens = array('b', (row[4] for row in rows))
+        self.by_type = {vehicle_type: array('L') for vehicle_type in self.vehicle_types}
+        for position, code in enumerate(self.type_codes):
+            self.by_type[self.vehicle_types[code]].append(position)
+        self.type_times = {
+            vehicle_type: array('d', (self.times[p] for p in positions))
+            for vehicle_type, positions in self.by_type.items()
+        }
+        self._timelines = OrderedDict()  # bucket -> timeline, limitado a RESULTS_TIMELINES_PER_JOB
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self):
+        return self.times[-1] if self.times else 0.0
+
+    def positions(self, vehicle_type=None, start=None, end=None):
+        """Posições (ordenadas por tempo) que atendem aos filtros"""
+        if vehicle_type:
+            positions = self.by_type.get(vehicle_type, array('L'))
+            times = self.type_times.get(vehicle_type, array('d'))
+        else:
+            positions, times = range(len(self.times)), self.times
+        low = bisect.bisect_left(times, start) if start is not None else 0
+        high = bisect.bisect_right(times, end) if end is not None else len(times)
+        return positions[low:high]
+
+    def row(self, position):
+        return {
+            'time': round(self.times[position], 3),
+            'frame': self.frames[position] if self.frames[position] >= 0 else None,
+            'vehicle_type': self.vehicle_types[self.type_codes[position]],
+            'confidence_score': round(self.confidences[position], 4),
+            'siren_on': bool(self.sirens[position]),
+        }
+
+    def timeline(self, bucket):
+        """
+        Quantidade de detecções por intervalo de `bucket` segundos, no total e por tipo.
+        O intervalo é ampliado para no mínimo RESULTS_MIN_BUCKET e no máximo
+        RESULTS_MAX_BUCKETS intervalos; o valor usado volta em 'bucket'.
+        """
+        bucket = max(bucket, RESULTS_MIN_BUCKET, self.duration / RESULTS_MAX_BUCKETS)
+        timeline = self._timelines.get(bucket)
+        if timeline is None:
+            size = min(int(self.duration // bucket) + 1, RESULTS_MAX_BUCKETS) if self.times else 0
+            counts = [0] * size
+            by_type = {vehicle_type: [0] * size for vehicle_type in self.vehicle_types}
+            for moment, code in zip(self.times, self.type_codes):
+                slot = min(max(int(moment // bucket), 0), size - 1)
+                counts[slot] += 1
+                by_type[self.vehicle_types[code]][slot] += 1
+            timeline = {'bucket': bucket, 'counts': counts, 'by_type': by_type}
+            self._timelines[bucket] = timeline
+            while len(self._timelines) > RESULTS_TIMELINES_PER_JOB:
+                self._timelines.popitem(last=False)
+        return timeline
+
+
+class JobResultsCache:
+    """Índices de jobs concluídos (imutáveis), com o resumo do job e os usuários que já o acessaram"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, job_id, user):
+        with self._lock:
+            entry = self._items.get(job_id)
+            if entry is None or user not in entry['users']:
+                return None
+            self._items.move_to_end(job_id)
+            return entry
+
+    def peek(self, job_id):
+        """Índice já montado para o job, sem verificar o usuário"""
+        with self._lock:
+            entry = self._items.get(job_id)
+            return entry['index'] if entry is not None else None
+
+    def put(self, job_id, user, job, index):
+        with self._lock:
+            entry = self._items.get(job_id)
+            if entry is None:
+                entry = {'job': job, 'index': index, 'users': set()}
+                self._items[job_id] = entry
+            entry['users'].add(user)
+            self._items.move_to_end(job_id)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+            return entry
+
+
+job_results_cache = JobResultsCache(RESULTS_INDEX_CACHE_SIZE)
+
+def load_job_results(job_id):
+    """
+    Retorna (job sem os resultados, índice, status_code). O índice só é
+    montado e guardado para jobs concluídos; o documento completo é baixado
+    uma única vez por usuário enquanto o índice estiver em cache.
+    """
+    user = session.get('user_email')
+    entry = job_results_cache.get(job_id, user)
+    if entry is not None:
+        return entry['job'], entry['index'], 200
+
+    success, job_data, status_code = api_call('GET', f'/detections/video/{job_id}', key=job_id)
+    if not success or not isinstance(job_data, dict):
+        return job_data, None, status_code
+
+    results = job_data.get('results') or []
+    job = {key: value for key, value in job_data.items() if key != 'results'}
+    if job_data.get('status') != 'completed':
+        return job, JobResultsIndex(job_id, results, job_data.get('fps')), status_code
+
+    # Outro usuário pode já ter montado o índice; reaproveitamos após o backend autorizar este
+    index = job_results_cache.peek(job_id)
+    if index is None:
+        index = JobResultsIndex(job_id, results, job_data.get('fps'))
+    job_results_cache.put(job_id, user, job, index)
+    return job, index, status_code
+
+def _float_arg(name):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f'{name} deve ser um número finito')
+    return number
+
+@app.route('/api/detections/video/<job_id>/results')
+@login_required
+def api_video_results(job_id):
+    """Resultados por quadro paginados, com filtros de tipo de veículo e janela de tempo (segundos)"""
+    try:
+        start = _float_arg('start')
+        end = _float_arg('end')
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(RESULTS_MAX_PAGE_SIZE, max(1, int(request.args.get('per_page', RESULTS_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({'error': 'Parâmetros inválidos'}), 400
+
+    job, index, status_code = load_job_results(job_id)
+    if index is None:
+        return jsonify({'error': 'Job não encontrado'}), 404 if status_code == 404 else 502
+
+    positions = index.positions(request.args.get('vehicle_type') or None, start, end)
+    total = len(positions)
+    offset = (page - 1) * per_page
+    return jsonify({
+        'job_id': job_id,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': math.ceil(total / per_page) if total else 0,
+        'items': [index.row(position) for position in positions[offset:offset + per_page]],
+    })
+
+@app.route('/api/detections/video/<job_id>/timeline')
+@login_required
+def api_video_timeline(job_id):
+    """Resumo das detecções por intervalo de tempo do vídeo"""
+    try:
+        bucket = _float_arg('bucket')
+    except ValueError:
+        return jsonify({'error': 'Parâmetros inválidos'}), 400
+    if bucket is None:
+        bucket = 1.0
+    if bucket <= 0:
+        return jsonify({'error': 'O intervalo deve ser maior que zero'}), 400
+
+    job, index, status_code = load_job_results(job_id)
+    if index is None:
+        return jsonify({'error': 'Job não encontrado'}), 404 if status_code == 404 else 502
+
+    return jsonify({
+        'job_id': job_id,
+        'total': len(index),
+        'duration': round(index.duration, 3),
+        'vehicle_types': index.vehicle_types,
+        **index.timeline(bucket),
+    })
+
+
+# =====================================================================
+# SINCRONIZAÇÃO INCREMENTAL (DELTA) DAS LISTAGENS
+# =====================================================================
+
+# coleção -> (endpoint do backend, campo de ID, template da linha, nome da variável no template)
+SYNC_COLLECTIONS = {
+    'jobs': ('/detections/jobs', 'job_id', 'detections/_job_row.html', 'job'),
+    'detections': ('/detections/images', '_id', 'detections/_image_row.html', 'detection'),
+}
+
+
+# Campos usados para datar cada item e status de itens que mudam sem alterar essas datas
+SYNC_TIME_FIELDS = ('updated_at', 'completed_at', 'processed_at', 'created_at')
+SYNC_VOLATILE_STATUSES = {'pending', 'processing'}
+
+
+def _sync_item_time(item):
+    return max((str(item[field]) for field in SYNC_TIME_FIELDS if item.get(field)), default='')
+
+
+# (coleção, digest) -> {id: fingerprint}; compartilhado entre usuários, pois o digest só depende dos dados
+_sync_snapshots = OrderedDict()
+_sync_snapshots_lock = threading.Lock()
+
+
+class DeltaSyncStore:
+    """
+    Mantém a última leitura de uma coleção do backend para calcular deltas.
+
+    A versão é derivada apenas dos dados ("<data mais recente>~<digest>~<IDs
+    em andamento>"), então qualquer worker que leia a mesma coleção produz o
+    mesmo token. Se o worker conhece o conjunto correspondente ao digest do
+    cliente, o delta é exato; caso contrário são enviados os itens datados após
+    a versão do cliente, os em andamento agora e os que estavam em andamento na
+    versão do cliente (podem ter mudado de status sem mudar as datas), junto com
+    a lista de IDs atuais para remover o resto.
+    """
+
+    def __init__(self, collection, id_field):
+        self.collection = collection
+        self.id_field = id_field
+        self.items = {}  # id -> item
+        self.fingerprints = {}  # id -> fingerprint
+        self.token = '~~'
+        self.last_update = 0.0
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        return time.monotonic() - self.last_update < SYNC_MIN_INTERVAL
+
+    def update(self, items):
+        """Registra a coleção atual e retorna o token de versão resultante"""
+        current = {str(item.get(self.id_field)): item for item in items}
+        fingerprints = {item_id: payload_etag(item) for item_id, item in current.items()}
+        digest = payload_etag(sorted(fingerprints.items()))[:16]
+        newest = max((_sync_item_time(item) for item in current.values()), default='')
+        volatile = sorted(item_id for item_id, item in current.items()
+                          if item.get('status') in SYNC_VOLATILE_STATUSES)
+        # Com muitos itens em andamento o token ficaria grande demais para a URL
+        volatile = ','.join(volatile) if len(volatile) <= SYNC_MAX_VOLATILE_IDS else '*'
+        with _sync_snapshots_lock:
+            _sync_snapshots[(self.collection, digest)] = fingerprints
+            _sync_snapshots.move_to_end((self.collection, digest))
+            while len(_sync_snapshots) > SYNC_SNAPSHOTS:
+                _sync_snapshots.popitem(last=False)
+        with self._lock:
+            self.items = current
+            self.fingerprints = fingerprints
+            self.token = f'{newest}~{digest}~{volatile}'
+            self.last_update = time.monotonic()
+            return self.token
+
+    def delta(self, since):
+        """Itens alterados e IDs removidos desde o token informado"""
+        since_time, _, rest = (since or '').partition('~')
+        since_digest, _, since_volatile = rest.partition('~')
+        since_volatile = set(since_volatile.split(',')) if since_volatile else set()
+        with _sync_snapshots_lock:
+            known = _sync_snapshots.get((self.collection, since_digest))
+        with self._lock:
+            delta = {'version': self.token, 'total': len(self.items)}
+            if since == self.token:
+                delta.update(changed=[], removed=[])
+            elif known is not None:
+                delta['changed'] = [item for item_id, item in self.items.items()
+                                    if known.get(item_id) != self.fingerprints[item_id]]
+                delta['removed'] = [item_id for item_id in known if item_id not in self.items]
+            elif '*' in since_volatile:
+                delta['changed'] = list(self.items.values())
+                delta['removed'] = []
+                delta['ids'] = list(self.items)
+            else:
+                # Itens sem data não podem ser comparados e são sempre reenviados
+                delta['changed'] = [item for item_id, item in self.items.items()
+                                    if not _sync_item_time(item)
+                                    or _sync_item_time(item) > since_time
+                                    or item.get('status') in SYNC_VOLATILE_STATUSES
+                                    or item_id in since_volatile]
+                delta['removed'] = []
+                delta['ids'] = list(self.items)
+            return delta
+
+
+_sync_stores = OrderedDict()
+_sync_stores_lock = threading.Lock()
+
+def get_sync_store(collection):
+    """Store da coleção para o usuário logado (cada usuário vê os dados do seu token)"""
+    key = (collection, session.get('user_email'))
+    with _sync_stores_lock:
+        store = _sync_stores.get(key)
+        if store is None:
+            store = DeltaSyncStore(collection, SYNC_COLLECTIONS[collection][1])
+            _sync_stores[key] = store
+        _sync_stores.move_to_end(key)
+        while len(_sync_stores) > SYNC_MAX_STORES:
+            _sync_stores.popitem(last=False)
+        return store
+
+@app.route('/api/sync/<collection>')
+@login_required
+def api_sync(collection):
+    """Retorna apenas as linhas alteradas de uma listagem desde a versão informada"""
+    if collection not in SYNC_COLLECTIONS:
+        return jsonify({'error': 'Coleção desconhecida'}), 404
+    endpoint, id_field, row_template, var_name = SYNC_COLLECTIONS[collection]
+    store = get_sync_store(collection)
+
+    # Várias abas/consultas em sequência reaproveitam a última leitura do backend
+    if not store.is_fresh():
+        success, data, _ = api_call('GET', endpoint)
+        if not success or not isinstance(data, list):
+            return jsonify({'error': 'Erro ao consultar o backend'}), 502
+        store.update(data)
+
+    delta = store.delta(request.args.get('since'))
+    delta['changed'] = [
+        {'id': str(item.get(id_field)), 'html': render_template(row_template, **{var_name: item})}
+        for item in delta['changed']
+    ]
+    return jsonify(delta)
+
+# =====================================================================
+# MONITORAMENTO DE CÂMERAS (STREAMS)
+# =====================================================================
+
+def redact_stream_source(source):
+    """Remove credenciais de URLs de câmera (usuário:senha@ e query string) antes de exibi-las"""
+    parts = urlsplit(source)
+    if not parts.scheme or (not parts.query and '@' not in parts.netloc):
+        return source
+    netloc = parts.netloc
+    if '@' in netloc:
+        netloc = '***@' + netloc.rsplit('@', 1)[1]
+    return urlunsplit((parts.scheme, netloc, parts.path, '***' if parts.query else '', ''))
+
+
+class CameraStream:
+    """
+    Lê continuamente uma câmera (URL RTSP/HTTP ou arquivo local), amostra
+    quadros por intervalo ou movimento e envia lotes para /detections/image.
+
+    A fila entre a leitura e o envio é limitada: quando o backend não dá
+    conta, os quadros novos são descartados e contabilizados em frames_dropped.
+    """
+
+    def __init__(self, source, name, mode, interval, headers, owner, executor):
+        self.id = uuid.uuid4().hex[:8]
+        self.source = source
+        self.name = name
+        self.mode = mode
+        self.interval = interval
+        self.headers = headers
+        self.owner = owner
+        self.status = 'running'
+        self.error = None
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.fps = 0.0
+        self.lag = None
+        self.frames_read = 0
+        self.frames_sampled = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self.batches = 0
+        self.errors = 0
+        self.detections_total = 0
+        self.recent = deque(maxlen=STREAM_RECENT_DETECTIONS)
+        self._executor = executor
+        self._queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, name=f'stream-read-{self.id}', daemon=True)
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name=f'stream-send-{self.id}', daemon=True)
+
+    @property
+    def source_id(self):
+        return f'stream:{self.name}'
+
+    def start(self):
+        self._reader.start()
+        self._dispatcher.start()
+
+    def stop(self):
+        if self.status == 'running':
+            self.status = 'stopped'
+        self._stop.set()
+
+    def _fail(self, message):
+        self.error = message
+        self.status = 'failed'
+        self._stop.set()
+
+    def _has_motion(self, frame, previous_gray):
+        small = cv2.resize(frame, (160, 90))
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        if previous_gray is None:
+            return True, gray
+        _, changed = cv2.threshold(cv2.absdiff(gray, previous_gray), 25, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(changed) / changed.size >= STREAM_MOTION_THRESHOLD, gray
+
+    def _read_loop(self):
+        capture = cv2.VideoCapture(self.source)
+        if not capture.isOpened():
+            self._fail('Não foi possível abrir a fonte de vídeo')
+            return
+
+        # Um arquivo local é lido no ritmo do seu FPS para simular uma câmera
+        is_file = os.path.isfile(self.source)
+        frame_period = 1.0 / (capture.get(cv2.CAP_PROP_FPS) or 25) if is_file else 0.0
+        last_sample = 0.0
+        previous_gray = None
+        window_start, window_frames = time.monotonic(), 0
+        try:
+            while not self._stop.is_set():
+                read_started = time.monotonic()
+                ok, frame = capture.read()
+                if not ok:
+                    if is_file:
+                        self.status = 'finished'
+                        break
+                    # Câmera remota: tenta reconectar sem encerrar o monitoramento
+                    self.error = 'Falha na leitura da câmera, reconectando...'
+                    capture.release()
+                    self._stop.wait(1.0)
+                    capture = cv2.VideoCapture(self.source)
+                    continue
+
+                self.frames_read += 1
+                window_frames += 1
+                if read_started - window_start >= 1.0:
+                    self.fps = window_frames / (read_started - window_start)
+                    window_start, window_frames = read_started, 0
+
+                now = time.time()
+                if now - last_sample >= self.interval:
+                    moved = True
+                    if self.mode == 'motion':
+                        moved, gray = self._has_motion(frame, previous_gray)
+                        if moved:
+                            previous_gray = gray
+                    if moved:
+                        last_sample = now
+                        self._enqueue(now, frame)
+
+                if frame_period:
+                    self._stop.wait(max(0.0, frame_period - (time.monotonic() - read_started)))
+        finally:
+            capture.release()
+
+    def _enqueue(self, captured_at, frame):
+        self.frames_sampled += 1
+        # Com a fila cheia o quadro é descartado antes de gastar CPU com a codificação
+        if self._queue.full():
+            self.frames_dropped += 1
+            return
+        ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, STREAM_JPEG_QUALITY])
+        if not ok:
+            return
+        try:
+            self._queue.put_nowait((captured_at, encoded.tobytes()))
+        except queue.Full:
+            self.frames_dropped += 1
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                if not self._reader.is_alive():
+                    break
+                continue
+            while len(batch) < STREAM_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            # Enquanto o lote está no backend a fila enche e a leitura passa a descartar quadros
+            wait([self._executor.submit(self._detect, captured_at, data) for captured_at, data in batch])
+            self.batches += 1
+
+        # Libera os quadros que sobraram na fila de uma câmera encerrada
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+    def _detect(self, captured_at, data):
+        try:
+            response = backend_pool.request(
+                'POST',
+                '/detections/image',
+                headers=self.headers,
+                files={'file': (f'{self.id}_{int(captured_at * 1000)}.jpg', data, 'image/jpeg')},
+                data={'source_id': self.source_id},
+                timeout=API_TIMEOUT
+            )
+        except requests.exceptions.RequestException as e:
+            with self._lock:
+                self.errors += 1
+                self.error = f'Erro de conexão: {str(e)}'
+            return
+
+        if response.status_code == 401:
+            self._fail('Sessão expirada. Inicie o monitoramento novamente.')
+            return
+        if response.status_code != 200:
+            with self._lock:
+                self.errors += 1
+                self.error = f'Erro {response.status_code} ao processar quadro'
+            return
+
+        try:
+            detections = response.json()
+        except ValueError:
+            with self._lock:
+                self.errors += 1
+                self.error = 'Resposta inválida da API ao processar quadro'
+            return
+        captured = datetime.fromtimestamp(captured_at).isoformat(timespec='seconds')
+        with self._lock:
+            self.frames_processed += 1
+            self.lag = time.time() - captured_at
+            self.error = None
+            for detection in detections if isinstance(detections, list) else []:
+                if detection.get('_id'):
+                    backend_pool.remember(detection['_id'], response.backend_node)
+                self.detections_total += 1
+                self.recent.appendleft({**detection, 'captured_at': captured})
+
+    def snapshot(self, with_detections=False):
+        with self._lock:
+            data = {
+                'id': self.id,
+                'name': self.name,
+                'source': redact_stream_source(self.source),
+                'mode': self.mode,
+                'interval': self.interval,
+                'status': self.status,
+                'error': self.error,
+                'started_at': self.started_at,
+                'fps': round(self.fps, 1),
+                'lag': round(self.lag, 2) if self.lag is not None else None,
+                'queue_depth': self._queue.qsize(),
+                'frames_read': self.frames_read,
+                'frames_sampled': self.frames_sampled,
+                'frames_dropped': self.frames_dropped,
+                'frames_processed': self.frames_processed,
+                'batches': self.batches,
+                'errors': self.errors,
+                'detections_total': self.detections_total,
+            }
+            if with_detections:
+                data['detections'] = list(self.recent)
+            return data
+
+
+class StreamManager:
+    """Câmeras monitoradas por este worker e o pool de threads que envia os quadros"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.streams = OrderedDict()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self, source, name, mode, interval, headers, owner):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='stream-detect')
+            stream = CameraStream(source, name, mode, interval, headers, owner, self._executor)
+            self.streams[stream.id] = stream
+            self._prune()
+        stream.start()
+        return stream
+
+    def _prune(self):
+        """Mantém apenas as STREAM_MAX_INACTIVE câmeras encerradas mais recentes"""
+        inactive = [stream_id for stream_id, stream in self.streams.items() if stream.status != 'running']
+        for stream_id in inactive[:max(0, len(inactive) - STREAM_MAX_INACTIVE)]:
+            del self.streams[stream_id]
+
+    def get(self, stream_id):
+        return self.streams.get(stream_id)
+
+    def stop(self, stream_id):
+        stream = self.streams.get(stream_id)
+        if stream is not None:
+            stream.stop()
+            with self._lock:
+                self._prune()
+        return stream
+
+    def snapshots(self):
+        return [stream.snapshot() for stream in list(self.streams.values())]
+
+
+stream_manager = StreamManager(STREAM_WORKERS)
+
+@app.route('/streams')
+@login_required
+def list_streams():
+    """Lista as câmeras monitoradas"""
+    return render_template('streams/list.html',
+                           streams=stream_manager.snapshots(),
+                           streams_available=cv2 is not None,
+                           default_interval=STREAM_SAMPLE_INTERVAL,
+                           error=request.args.get('error'))
+
+@app.route('/streams/new', methods=['POST'])
+@admin_required
+def start_stream():
+    """Inicia o monitoramento de uma câmera ou arquivo local"""
+    if cv2 is None:
+        return redirect(url_for('list_streams', error='OpenCV (opencv-python-headless) não está instalado no servidor'))
+
+    source = (request.form.get('source') or '').strip()
+    name = (request.form.get('name') or '').strip() or f'camera_{len(stream_manager.streams) + 1}'
+    mode = request.form.get('mode', 'interval')
+    if not source:
+        return redirect(url_for('list_streams', error='Informe a URL da câmera ou o caminho do arquivo'))
+    if mode not in ('interval', 'motion'):
+        return redirect(url_for('list_streams', error='Modo de amostragem inválido'))
+    try:
+        interval = float(request.form.get('interval') or STREAM_SAMPLE_INTERVAL)
+    except ValueError:
+        return redirect(url_for('list_streams', error='Intervalo de amostragem inválido'))
+    if interval <= 0:
+        return redirect(url_for('list_streams', error='O intervalo deve ser maior que zero'))
+
+    stream = stream_manager.start(source, name, mode, interval, get_auth_header(), session.get('user_email'))
+    return redirect(url_for('stream_live', stream_id=stream.id))
+
+@app.route('/streams/<stream_id>')
+@login_required
+def stream_live(stream_id):
+    """Página ao vivo de uma câmera"""
+    stream = stream_manager.get(stream_id)
+    if stream is None:
+        return render_template('error.html', error=f'Câmera {stream_id} não encontrada'), 404
+    return render_template('streams/live.html', stream=stream.snapshot(with_detections=True))
+
+@app.route('/streams/<stream_id>/stop', methods=['POST'])
+@admin_required
+def stop_stream(stream_id):
+    stream_manager.stop(stream_id)
+    return redirect(url_for('list_streams'))
+
+@app.route('/api/streams/<stream_id>')
+@login_required
+def api_stream_status(stream_id):
+    """Contadores e detecções recentes de uma câmera, consultados pela página ao vivo"""
+    stream = stream_manager.get(stream_id)
+    if stream is None:
+        return jsonify({'error': 'Câmera não encontrada'}), 404
+    return jsonify(stream.snapshot(with_detections=True))
+
 
 # =====================================================================
 # ROTAS DE RELATÓRIOS
@@ -76,6 +76,13 @@ function formatPercent(value) {
     return (value * 100).toFixed(2) + '%';
 }
 
+// Função para escapar texto vindo da API antes de inseri-lo via innerHTML
+function escapeHtml(value) {
+    const div = document.createElement('div');
+    div.textContent = value == null ? '' : String(value);
+    return div.innerHTML;
+}
+
 // Inicialização quando o DOM está pronto
 document.addEventListener('DOMContentLoaded', function() {
     // Adicionar validação de formulários
@@ -101,10 +108,78 @@ document.addEventListener('DOMContentLoaded', function() {
     });
 });
 
+// Função para aplicar numa tabela apenas as linhas alteradas desde a última versão
+async function syncTable(tbody) {
+    const collection = tbody.dataset.syncCollection;
+    const since = encodeURIComponent(tbody.dataset.syncVersion || '');
+    const data = await fetchAPI(`/api/sync/${collection}?since=${since}`);
+
+    // Sem histórico da versão do cliente, o servidor envia os IDs atuais para remover o resto
+    const removed = new Set(data.removed);
+    if (data.ids) {
+        const current = new Set(data.ids);
+        tbody.querySelectorAll('tr[data-row-id]').forEach(row => {
+            if (!current.has(row.dataset.rowId)) removed.add(row.dataset.rowId);
+        });
+    }
+    removed.forEach(id => {
+        const row = tbody.querySelector(`tr[data-row-id="${CSS.escape(id)}"]`);
+        if (row) row.remove();
+    });
+    // Linhas novas chegam na ordem do backend (mais recentes primeiro) e são inseridas juntas
+    const added = [];
+    data.changed.forEach(change => {
+        const template = document.createElement('template');
+        template.innerHTML = change.html.trim();
+        const newRow = template.content.firstElementChild;
+        const currentRow = tbody.querySelector(`tr[data-row-id="${CSS.escape(change.id)}"]`);
+        if (currentRow) {
+            currentRow.replaceWith(newRow);
+        } else {
+            added.push(newRow);
+        }
+    });
+    tbody.prepend(...added);
+
+    tbody.dataset.syncVersion = data.version;
+    document.querySelectorAll('[data-sync-count]').forEach(element => {
+        element.textContent = data.total;
+    });
+
+    // Alterna entre a tabela e a mensagem de lista vazia
+    const hasRows = tbody.querySelector('tr[data-row-id]') !== null;
+    document.querySelectorAll(`[data-sync-table="${collection}"]`).forEach(element => {
+        element.style.display = hasRows ? '' : 'none';
+    });
+    document.querySelectorAll(`[data-sync-empty="${collection}"]`).forEach(element => {
+        element.style.display = hasRows ? 'none' : '';
+    });
+}
+
 // Função para atualizar a página periodicamente
+// Tabelas com data-sync-collection recebem apenas as alterações; sem elas a página é recarregada
 function autoRefresh(interval = 5000) {
-    setInterval(() => {
-        location.reload();
+    const tables = document.querySelectorAll('tbody[data-sync-collection]');
+    if (tables.length === 0) {
+        setInterval(() => {
+            location.reload();
+        }, interval);
+        return;
+    }
+
+    let syncing = false;
+    setInterval(async () => {
+        if (syncing) return;
+        syncing = true;
+        try {
+            for (const tbody of tables) {
+                await syncTable(tbody);
+            }
+        } catch (error) {
+            console.error('Erro na sincronização:', error);
+        } finally {
+            syncing = false;
+        }
     }, interval);
 }
 
@@ -147,6 +222,7 @@ window.checkVideoStatus = checkVideoStatus;
 window.formatDate = formatDate;
 window.formatPercent = formatPercent;
 window.autoRefresh = autoRefresh;
+window.syncTable = syncTable;
 window.showNotification = showNotification;
 window.disableSubmitButton = disableSubmitButton;
 
@@ -0,0 +1,106 @@
+"""
+Testes do controle de admissão (AdmissionPool e hooks da aplicação)
+"""
+
+import threading
+import time
+
+import pytest
+
+import app as frontend
+
+
+def make_pool(max_active=1, max_queue=1, per_user=2, queue_timeout=1.0):
+    return frontend.AdmissionPool('test', max_active=max_active, max_queue=max_queue,
+                                  per_user=per_user, queue_timeout=queue_timeout)
+
+
+def test_per_user_limit_returns_429_and_frees_on_release():
+    pool = make_pool(max_active=5, per_user=2)
+    assert pool.acquire('ana') is None
+    assert pool.acquire('ana') is None
+    assert pool.acquire('ana') == 429
+    assert pool.acquire('bia') is None
+    pool.release('ana', 0.1)
+    assert pool.acquire('ana') is None
+    assert pool.rejected['per_user'] == 1
+
+
+def test_anonymous_user_is_not_limited_per_user():
+    pool = make_pool(max_active=5, per_user=1)
+    assert all(pool.acquire(None) is None for _ in range(3))
+    assert pool.snapshot()['users'] == 0
+
+
+def test_full_queue_returns_503():
+    pool = make_pool(max_active=1, max_queue=0)
+    assert pool.acquire('ana') is None
+    assert pool.acquire('bia') == 503
+    assert pool.rejected['queue_full'] == 1
+
+
+def test_queue_timeout_returns_503_and_clears_user():
+    pool = make_pool(max_active=1, max_queue=1, queue_timeout=0.05)
+    assert pool.acquire('ana') is None
+    assert pool.acquire('bia') == 503
+    snapshot = pool.snapshot()
+    assert snapshot['rejected']['timeout'] == 1
+    assert snapshot['queue_depth'] == 0 and snapshot['users'] == 1
+
+
+def test_queued_request_is_admitted_when_a_slot_is_released():
+    pool = make_pool(max_active=1, max_queue=1, queue_timeout=5.0)
+    assert pool.acquire('ana') is None
+    result = {}
+    waiter = threading.Thread(target=lambda: result.setdefault('status', pool.acquire('bia')))
+    waiter.start()
+    while pool.snapshot()['queue_depth'] == 0:
+        time.sleep(0.01)
+    pool.release('ana', 0.1)
+    waiter.join(timeout=5)
+    assert result == {'status': None}
+    assert pool.snapshot()['active'] == 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # Em modo de teste as exceções das views chegam ao teste
+    monkeypatch.setitem(frontend.app.config, 'TESTING', True)
+    return frontend.app.test_client()
+
+
+def login(client, role='operator'):
+    with client.session_transaction() as session:
+        session['access_token'] = 'token'
+        session['user_email'] = 'ana@example.com'
+        session['user_role'] = role
+
+
+def test_teardown_releases_slot_even_when_the_view_fails(client, monkeypatch):
+    pool = frontend.admission_pools['interactive']
+    login(client)
+
+    def broken_api_call(*args, **kwargs):
+        raise RuntimeError('falha simulada')
+
+    monkeypatch.setattr(frontend, 'api_call', broken_api_call)
+    with pytest.raises(RuntimeError):
+        client.get('/employees')
+    snapshot = pool.snapshot()
+    assert snapshot['active'] == 0 and snapshot['users'] == 0
+
+
+def test_per_user_rejection_returns_retry_after(client, monkeypatch):
+    monkeypatch.setitem(frontend.admission_pools, 'interactive', make_pool(max_active=5, per_user=0))
+    login(client)
+    response = client.get('/api/admission/metrics')
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+
+def test_metrics_require_admin(client):
+    login(client)
+    assert client.get('/api/admission/metrics').status_code == 302
+    login(client, role='admin')
+    data = client.get('/api/admission/metrics').get_json()
+    assert set(data['pools']) == {'upload', 'media', 'interactive'}
@@ -0,0 +1,60 @@
+"""
+Testes do roteamento entre nós do backend (BackendPool)
+"""
+
+import os
+from collections import Counter
+
+import pytest
+
+import app as frontend
+
+
+class FakeResponse:
+    def __init__(self, url, status_code=200):
+        self.url = url
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = frontend.BackendPool(['http://n1', 'http://n2', 'http://n3'], '/health', 10, 3)
+    pool._checker_pid = os.getpid()  # sem thread de health check nos testes
+    monkeypatch.setattr(frontend.requests, 'request', lambda method, url, **kwargs: FakeResponse(url))
+    return pool
+
+
+def test_uploads_spread_across_nodes_with_equal_load(pool):
+    picks = Counter(
+        pool.request('POST', '/detections/image').backend_node.url
+        for _ in range(9)
+    )
+    assert picks == {'http://n1': 3, 'http://n2': 3, 'http://n3': 3}
+
+
+def test_least_loaded_node_is_preferred(pool):
+    pool.nodes[0].outstanding = 2
+    pool.nodes[1].outstanding = 1
+    picks = {pool.request('POST', '/detections/video').backend_node.url for _ in range(5)}
+    assert picks == {'http://n3'}
+
+
+def test_streamed_response_counts_as_load_until_closed(pool):
+    response = pool.request('GET', '/detections/video/annotated/job', key='job', stream=True)
+    node = response.backend_node
+    assert node.outstanding == 1
+
+    response.close()
+    response.close()
+    assert node.outstanding == 0
+
+
+def test_job_is_pinned_to_node_that_created_it(pool):
+    upload = pool.request('POST', '/detections/video')
+    pool.remember('job-1', upload.backend_node)
+    for _ in range(5):
+        assert pool.request('GET', '/detections/video/job-1', key='job-1').backend_node is upload.backend_node
@@ -0,0 +1,89 @@
+"""
+Testes dos deltas de sincronização das listagens (DeltaSyncStore)
+"""
+
+import pytest
+
+import app as frontend
+
+
+def make_jobs(count):
+    return [
+        {'job_id': f'job{i}', 'status': 'completed', 'created_at': f'2025-01-01T00:{i // 60:02d}:{i % 60:02d}'}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def clear_snapshots():
+    frontend._sync_snapshots.clear()
+    yield
+    frontend._sync_snapshots.clear()
+
+
+def test_unchanged_collection_returns_empty_delta():
+    store = frontend.DeltaSyncStore('jobs', 'job_id')
+    token = store.update(make_jobs(500))
+    delta = store.delta(token)
+    assert delta['version'] == token
+    assert delta['changed'] == [] and delta['removed'] == []
+
+
+def test_other_worker_computes_same_version_and_small_delta():
+    jobs = make_jobs(500)
+    token = frontend.DeltaSyncStore('jobs', 'job_id').update(jobs)
+
+    # Outro worker: nenhum estado compartilhado com o primeiro
+    frontend._sync_snapshots.clear()
+    other = frontend.DeltaSyncStore('jobs', 'job_id')
+    assert other.update(jobs) == token
+
+    jobs = jobs[1:] + [{'job_id': 'new', 'status': 'pending', 'created_at': '2025-01-02T00:00:00'}]
+    frontend._sync_snapshots.clear()
+    other.update(jobs)
+    delta = other.delta(token)
+    assert [item['job_id'] for item in delta['changed']] == ['new']
+    assert 'job0' not in delta['ids']
+
+
+def test_known_snapshot_gives_exact_delta():
+    jobs = make_jobs(10)
+    store = frontend.DeltaSyncStore('jobs', 'job_id')
+    token = store.update(jobs)
+    jobs[3] = dict(jobs[3], status='failed')
+    del jobs[7]
+    store.update(jobs)
+    delta = store.delta(token)
+    assert [item['job_id'] for item in delta['changed']] == ['job3']
+    assert delta['removed'] == ['job7']
+    assert 'ids' not in delta
+
+
+def test_status_change_without_new_timestamp_reaches_other_worker():
+    jobs = [
+        {'job_id': 'a', 'status': 'processing', 'created_at': '2025-01-01T00:00:00'},
+        {'job_id': 'b', 'status': 'completed', 'created_at': '2025-01-01T00:00:01'},
+    ]
+    token = frontend.DeltaSyncStore('jobs', 'job_id').update(jobs)
+
+    # O outro worker nunca viu o digest do cliente
+    frontend._sync_snapshots.clear()
+    other = frontend.DeltaSyncStore('jobs', 'job_id')
+    other.update([dict(jobs[0], status='failed'), jobs[1]])
+    frontend._sync_snapshots.clear()
+    delta = other.delta(token)
+    assert [item['job_id'] for item in delta['changed']] == ['a']
+    assert delta['changed'][0]['status'] == 'failed'
+
+
+def test_too_many_items_in_progress_resends_everything():
+    jobs = [{'job_id': f'job{i}', 'status': 'pending', 'created_at': '2025-01-01T00:00:00'}
+            for i in range(frontend.SYNC_MAX_VOLATILE_IDS + 1)]
+    token = frontend.DeltaSyncStore('jobs', 'job_id').update(jobs)
+    assert token.endswith('~*')
+
+    frontend._sync_snapshots.clear()
+    other = frontend.DeltaSyncStore('jobs', 'job_id')
+    other.update([dict(job, status='completed') for job in jobs])
+    frontend._sync_snapshots.clear()
+    assert len(other.delta(token)['changed']) == len(jobs)
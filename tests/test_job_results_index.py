@@ -0,0 +1,70 @@
+"""
+Testes do índice colunar de resultados dos vídeos (JobResultsIndex)
+"""
+
+import pytest
+
+import app as frontend
+
+
+def make_results():
+    return [
+        {'timestamp': 5.0, 'frame_number': 150, 'vehicle_type': 'ambulance', 'confidence_score': 0.9},
+        {'timestamp': 1.0, 'frame_number': 30, 'vehicle_type': 'police_car', 'confidence_score': 0.8},
+        {'timestamp': 3.0, 'frame_number': 90, 'vehicle_type': 'ambulance', 'confidence_score': 0.7},
+        {'timestamp': 7.5, 'frame_number': 225, 'vehicle_type': 'fire_truck', 'confidence_score': 0.6},
+    ]
+
+
+def times(index, positions):
+    return [index.row(position)['time'] for position in positions]
+
+
+def test_time_window_uses_sorted_times_and_inclusive_bounds():
+    index = frontend.JobResultsIndex('job', make_results())
+    assert list(index.times) == [1.0, 3.0, 5.0, 7.5]
+    assert times(index, index.positions(start=3.0, end=5.0)) == [3.0, 5.0]
+    assert times(index, index.positions(start=5.5)) == [7.5]
+    assert times(index, index.positions(end=0.5)) == []
+
+
+def test_filter_by_vehicle_type():
+    index = frontend.JobResultsIndex('job', make_results())
+    assert times(index, index.positions('ambulance')) == [3.0, 5.0]
+    assert times(index, index.positions('ambulance', start=4.0)) == [5.0]
+    assert list(index.positions('helicopter')) == []
+
+
+def test_absolute_iso_times_become_relative_seconds():
+    results = [
+        {'timestamp': '2025-01-01T12:00:10Z', 'vehicle_type': 'ambulance'},
+        {'timestamp': '2025-01-01T12:00:00Z', 'vehicle_type': 'ambulance'},
+    ]
+    index = frontend.JobResultsIndex('job', results)
+    assert list(index.times) == [0.0, 10.0]
+    assert index.duration == 10.0
+
+
+def test_invalid_confidence_defaults_to_zero():
+    index = frontend.JobResultsIndex('job', [
+        {'timestamp': 0, 'vehicle_type': 'ambulance', 'confidence_score': 'n/a'},
+        {'timestamp': 1, 'vehicle_type': 'ambulance', 'confidence': '0.5'},
+    ])
+    assert [index.row(position)['confidence_score'] for position in range(len(index))] == [0.0, 0.5]
+
+
+def test_timeline_counts_per_bucket_and_type():
+    index = frontend.JobResultsIndex('job', make_results())
+    timeline = index.timeline(2.0)
+    assert timeline['counts'] == [1, 1, 1, 1]
+    assert timeline['by_type']['ambulance'] == [0, 1, 1, 0]
+
+
+@pytest.mark.parametrize('bucket', [0.0001, 1e-12])
+def test_timeline_bucket_is_clamped(bucket):
+    results = [{'timestamp': float(i), 'vehicle_type': 'ambulance'} for i in range(0, 100001, 1000)]
+    index = frontend.JobResultsIndex('job', results)
+    timeline = index.timeline(bucket)
+    assert timeline['bucket'] == max(frontend.RESULTS_MIN_BUCKET, index.duration / frontend.RESULTS_MAX_BUCKETS)
+    assert len(timeline['counts']) <= frontend.RESULTS_MAX_BUCKETS
+    assert sum(timeline['counts']) == len(results)